@@ -1,15 +1,65 @@
 from __future__ import annotations
 
 import datetime as dt
-import re
-from typing import Literal, Optional, Sequence
-
-from pydantic import BaseModel, Field, field_validator, model_validator
-
-from tools.metrics import DATASET_OWID_ENERGY, DEFAULT_METRIC_REGISTRY
+import functools
+import time
+from typing import Annotated, Any, Literal, Optional, Sequence
+
+from pydantic import BaseModel, Discriminator, Field, Tag, field_validator, model_validator
+
+from tools import metrics
+from tools.metrics import DATASET_OWID_ENERGY, MetricSpec
+
+
+# ISO 3166-1 alpha-3 country codes; membership replaces a per-code format check.
+_VALID_ISO3: frozenset[str] = frozenset({
+    "ABW", "AFG", "AGO", "AIA", "ALA", "ALB", "AND", "ARE", "ARG", "ARM", "ASM", "ATA",
+    "ATF", "ATG", "AUS", "AUT", "AZE", "BDI", "BEL", "BEN", "BES", "BFA", "BGD", "BGR",
+    "BHR", "BHS", "BIH", "BLM", "BLR", "BLZ", "BMU", "BOL", "BRA", "BRB", "BRN", "BTN",
+    "BVT", "BWA", "CAF", "CAN", "CCK", "CHE", "CHL", "CHN", "CIV", "CMR", "COD", "COG",
+    "COK", "COL", "COM", "CPV", "CRI", "CUB", "CUW", "CXR", "CYM", "CYP", "CZE", "DEU",
+    "DJI", "DMA", "DNK", "DOM", "DZA", "ECU", "EGY", "ERI", "ESH", "ESP", "EST", "ETH",
+    "FIN", "FJI", "FLK", "FRA", "FRO", "FSM", "GAB", "GBR", "GEO", "GGY", "GHA", "GIB",
+    "GIN", "GLP", "GMB", "GNB", "GNQ", "GRC", "GRD", "GRL", "GTM", "GUF", "GUM", "GUY",
+    "HKG", "HMD", "HND", "HRV", "HTI", "HUN", "IDN", "IMN", "IND", "IOT", "IRL", "IRN",
+    "IRQ", "ISL", "ISR", "ITA", "JAM", "JEY", "JOR", "JPN", "KAZ", "KEN", "KGZ", "KHM",
+    "KIR", "KNA", "KOR", "KWT", "LAO", "LBN", "LBR", "LBY", "LCA", "LIE", "LKA", "LSO",
+    "LTU", "LUX", "LVA", "MAC", "MAF", "MAR", "MCO", "MDA", "MDG", "MDV", "MEX", "MHL",
+    "MKD", "MLI", "MLT", "MMR", "MNE", "MNG", "MNP", "MOZ", "MRT", "MSR", "MTQ", "MUS",
+    "MWI", "MYS", "MYT", "NAM", "NCL", "NER", "NFK", "NGA", "NIC", "NIU", "NLD", "NOR",
+    "NPL", "NRU", "NZL", "OMN", "PAK", "PAN", "PCN", "PER", "PHL", "PLW", "PNG", "POL",
+    "PRI", "PRK", "PRT", "PRY", "PSE", "PYF", "QAT", "REU", "ROU", "RUS", "RWA", "SAU",
+    "SDN", "SEN", "SGP", "SGS", "SHN", "SJM", "SLB", "SLE", "SLV", "SMR", "SOM", "SPM",
+    "SRB", "SSD", "STP", "SUR", "SVK", "SVN", "SWE", "SWZ", "SXM", "SYC", "SYR", "TCA",
+    "TCD", "TGO", "THA", "TJK", "TKL", "TKM", "TLS", "TON", "TTO", "TUN", "TUR", "TUV",
+    "TWN", "TZA", "UGA", "UKR", "UMI", "URY", "USA", "UZB", "VAT", "VCT", "VEN", "VGB",
+    "VIR", "VNM", "VUT", "WLF", "WSM", "YEM", "ZAF", "ZMB", "ZWE"
+})
+
+
+# (monotonic timestamp of last refresh, cached calendar year)
+_YEAR_CACHE: tuple[float, int] = (0.0, 0)
+_YEAR_CACHE_TTL_SEC = 3600.0
+
+
+def _current_year() -> int:
+    """
+    Current calendar year, refreshed at most once per hour.
+    """
+    global _YEAR_CACHE
+    now = time.monotonic()
+    if now - _YEAR_CACHE[0] > _YEAR_CACHE_TTL_SEC or not _YEAR_CACHE[1]:
+        _YEAR_CACHE = (now, dt.datetime.now().year)
+    return _YEAR_CACHE[1]
 
 
-ISO3_RE = re.compile(r"^[A-Z]{3}$")
+@functools.lru_cache(maxsize=64)
+def _resolve_metric_spec(dataset_id: str, metric_id: str) -> MetricSpec:
+    """
+    Memoized registry lookup shared by metric_id validation and PlanV1.metric_spec().
+    Unknown ids raise KeyError and are not cached.
+    """
+    return metrics.DEFAULT_METRIC_REGISTRY.get(dataset_id, metric_id)
 
 
 class ViewLine(BaseModel):
@@ -29,7 +79,35 @@ class ViewBar(BaseModel):
     mode: Literal["latest_year", "delta"] = "latest_year"
 
 
-ViewSpec = ViewLine | ViewBar
+_VIEW_ID_BY_TYPE = {"line": "timeseries", "bar": "summary"}
+
+
+def _view_tag(v: Any) -> Optional[str]:
+    """
+    Pick the view model for an input. view_id is optional on both views, so fall back
+    to the chart type, and default to the timeseries view (as ViewLine's defaults do).
+    """
+    if isinstance(v, dict):
+        view_id, view_type = v.get("view_id"), v.get("type")
+    else:
+        view_id, view_type = getattr(v, "view_id", None), getattr(v, "type", None)
+    # Anything other than a string can't name a view (and may be unhashable);
+    # returning None lets pydantic report union_tag_not_found as a ValidationError.
+    if view_id is not None:
+        return view_id if isinstance(view_id, str) else None
+    if view_type is not None:
+        if not isinstance(view_type, str):
+            return None
+        return _VIEW_ID_BY_TYPE.get(view_type, view_type)
+    return "timeseries"
+
+
+# Tagged so pydantic-core dispatches straight to the matching model
+# instead of trying each member of the union in turn.
+ViewSpec = Annotated[
+    Annotated[ViewLine, Tag("timeseries")] | Annotated[ViewBar, Tag("summary")],
+    Discriminator(_view_tag),
+]
 
 
 class PlanV1(BaseModel):
@@ -66,7 +144,7 @@ class PlanV1(BaseModel):
     @classmethod
     def validate_metric_id(cls, v: str) -> str:
         # fail fast if the metric isn't supported
-        _ = DEFAULT_METRIC_REGISTRY.get(DATASET_OWID_ENERGY, v)
+        _ = _resolve_metric_spec(DATASET_OWID_ENERGY, v)
         return v
 
     @field_validator("countries")
@@ -75,32 +153,26 @@ class PlanV1(BaseModel):
         if not countries:
             raise ValueError("countries must contain at least one ISO3 code")
 
-        cleaned: list[str] = []
+        # Validate, normalise and de-duplicate (preserving order) in one pass.
+        seen: dict[str, None] = {}
         for c in countries:
             if not isinstance(c, str):
                 raise ValueError("countries must be a list of strings (ISO3 codes)")
             cc = c.strip().upper()
-            if not ISO3_RE.match(cc):
+            if cc not in _VALID_ISO3:
                 raise ValueError(
                     f"Invalid country code '{c}'. Phase 1 requires ISO3 codes like 'AUS', 'DEU'."
                 )
-            cleaned.append(cc)
-
-        # enforce uniqueness while preserving order
-        seen = set()
-        uniq = []
-        for c in cleaned:
-            if c not in seen:
-                uniq.append(c)
-                seen.add(c)
+            seen.setdefault(cc, None)
 
+        uniq = list(seen)
         if len(uniq) > 3:
             raise ValueError("Phase 1 supports up to 3 countries")
         return uniq
 
     @model_validator(mode="after")
     def validate_years_and_views(self) -> "PlanV1":
-        current_year = dt.datetime.now().year
+        current_year = _current_year()
 
         if self.year_start > self.year_end:
             raise ValueError("year_start must be <= year_end")
@@ -129,8 +201,30 @@ class PlanV1(BaseModel):
 
         return self
 
-    def metric_spec(self):
+    @classmethod
+    def trusted(cls, **kwargs) -> "PlanV1":
+        """
+        Build a plan WITHOUT running any validation (field constraints, validators,
+        or nested view parsing), via model_construct.
+
+        Only for planner-internal hot loops where the values already passed a full
+        PlanV1(...) validation once, e.g. trusted(**{**plan.__dict__, "year_end": y}).
+        Views must be ViewLine/ViewBar instances, not dicts. Never use for LLM/UI input.
+        """
+        return cls.model_construct(**kwargs)
+
+    def metric_spec(self) -> MetricSpec:
         """
         Convenience: resolve metric_id -> MetricSpec from registry.
         """
-        return DEFAULT_METRIC_REGISTRY.get(self.dataset_id, self.metric_id)
+        return _resolve_metric_spec(self.dataset_id, self.metric_id)
+
+
+def parse_plan_json(buf: str | bytes) -> PlanV1:
+    """
+    Parse + validate raw planner JSON (e.g. an LLM response body) into a PlanV1.
+
+    Validates straight from the JSON text with the model's prebuilt validator,
+    instead of json.loads() + PlanV1.model_validate().
+    """
+    return PlanV1.model_validate_json(buf)
@@ -1,14 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
 
 
 DATASET_OWID_ENERGY = "owid_energy"
 
 
-@dataclass(frozen=True)
-class MetricSpec:
+class MetricSpec(NamedTuple):
     """
     A curated metric exposed to the agent.
 
@@ -35,8 +34,10 @@ class MetricRegistry:
     - We can later remap metric_id -> column if OWID column names change.
     """
 
+    __slots__ = ("_by_key", "_metric_ids", "_dataset_ids")
+
     def __init__(self) -> None:
-        self._datasets: Dict[str, Dict[str, MetricSpec]] = {
+        datasets: Dict[str, Dict[str, MetricSpec]] = {
             DATASET_OWID_ENERGY: {
                 # --- Energy consumption ---
                 "energy_per_capita": MetricSpec(
@@ -123,35 +124,55 @@ class MetricRegistry:
             }
         }
 
+        # Flattened (dataset_id, metric_id) index so get() is a single dict lookup,
+        # plus sorted id tuples computed once for listings and error messages.
+        # Wrapped read-only: the curated registry is never mutated after construction.
+        self._by_key: Mapping[Tuple[str, str], MetricSpec] = MappingProxyType({
+            (dataset_id, metric_id): spec
+            for dataset_id, metrics in datasets.items()
+            for metric_id, spec in metrics.items()
+        })
+        self._metric_ids: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+            dataset_id: tuple(sorted(metrics)) for dataset_id, metrics in datasets.items()
+        })
+        self._dataset_ids: Tuple[str, ...] = tuple(sorted(datasets))
+
     def dataset_ids(self) -> List[str]:
-        return sorted(self._datasets.keys())
+        return list(self._dataset_ids)
 
     def metric_ids(self, dataset_id: str) -> List[str]:
         self._assert_dataset(dataset_id)
-        return sorted(self._datasets[dataset_id].keys())
+        return list(self._metric_ids[dataset_id])
 
     def get(self, dataset_id: str, metric_id: str) -> MetricSpec:
-        self._assert_dataset(dataset_id)
-        ds = self._datasets[dataset_id]
-        if metric_id not in ds:
+        spec = self._by_key.get((dataset_id, metric_id))
+        if spec is None:
+            self._assert_dataset(dataset_id)
             raise KeyError(
                 f"Unknown metric_id='{metric_id}' for dataset_id='{dataset_id}'. "
-                f"Supported: {sorted(ds.keys())}"
+                f"Supported: {list(self._metric_ids[dataset_id])}"
             )
-        return ds[metric_id]
+        return spec
 
     def maybe_get(self, dataset_id: str, metric_id: str) -> Optional[MetricSpec]:
-        try:
-            return self.get(dataset_id, metric_id)
-        except KeyError:
-            return None
+        return self._by_key.get((dataset_id, metric_id))
 
     def _assert_dataset(self, dataset_id: str) -> None:
-        if dataset_id not in self._datasets:
+        if dataset_id not in self._metric_ids:
             raise KeyError(
-                f"Unknown dataset_id='{dataset_id}'. Supported: {sorted(self._datasets.keys())}"
+                f"Unknown dataset_id='{dataset_id}'. Supported: {list(self._dataset_ids)}"
             )
 
 
 # A global default registry instance (simple + good enough for Phase 1).
-DEFAULT_METRIC_REGISTRY = MetricRegistry()
+# Built on first attribute access (PEP 562) rather than at import time; callers that
+# want it lazy should reach it as `metrics.DEFAULT_METRIC_REGISTRY` at call time.
+DEFAULT_METRIC_REGISTRY: MetricRegistry
+
+
+def __getattr__(name: str):
+    if name == "DEFAULT_METRIC_REGISTRY":
+        global DEFAULT_METRIC_REGISTRY
+        DEFAULT_METRIC_REGISTRY = MetricRegistry()
+        return DEFAULT_METRIC_REGISTRY
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
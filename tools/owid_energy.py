@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import csv
 import datetime as dt
 import hashlib
 import os
+import sys
+import weakref
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Optional, Tuple
@@ -10,6 +13,8 @@ from typing import Dict, Optional, Tuple
 import duckdb
 import requests
 
+from tools import metrics
+
 
 # ---- Phase 1 constants ----
 
@@ -32,6 +37,15 @@ TABLE_NAME = "energy_raw"
 
 REQUIRED_COLUMNS = {"year", "country", "iso_code"}
 
+# Explicit DuckDB types for the key columns; curated metric columns are pinned to DOUBLE.
+COLUMN_TYPES = {"year": "INTEGER", "country": "VARCHAR", "iso_code": "VARCHAR"}
+
+# inspect_schema results: {conn: {table_name: schema}}; see invalidate_schema_cache().
+# Weakly keyed so a connection's entries go away with the connection.
+_SCHEMA_CACHE: weakref.WeakKeyDictionary[
+    duckdb.DuckDBPyConnection, Dict[str, Dict[str, str]]
+] = weakref.WeakKeyDictionary()
+
 
 @dataclass(frozen=True)
 class SourceMetadata:
@@ -46,12 +60,42 @@ def get_dataset_url() -> str:
     return OWID_ENERGY_CSV_URL
 
 
+def _now_iso_utc() -> str:
+    return dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
 def _sha256_file(path: Path) -> str:
-    h = hashlib.sha256()
     with path.open("rb") as f:
+        if sys.version_info >= (3, 11):
+            # Read/hash loop runs entirely in C.
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
         for chunk in iter(lambda: f.read(1024 * 1024), b""):
             h.update(chunk)
-    return h.hexdigest()
+        return h.hexdigest()
+
+
+def _sha256_sidecar(csv_path: Path) -> Path:
+    return csv_path.with_suffix(csv_path.suffix + ".sha256")
+
+
+def _cached_sha256(csv_path: Path) -> str:
+    """
+    Return the CSV's SHA-256 from its sidecar file if the sidecar is at least as new
+    as the CSV; otherwise hash the CSV and refresh the sidecar.
+    """
+    sidecar = _sha256_sidecar(csv_path)
+    try:
+        if sidecar.stat().st_mtime >= csv_path.stat().st_mtime:
+            sha = sidecar.read_text().strip()
+            if sha:
+                return sha
+    except FileNotFoundError:
+        pass
+
+    sha = _sha256_file(csv_path)
+    sidecar.write_text(sha)
+    return sha
 
 
 def download_dataset(
@@ -72,36 +116,57 @@ def download_dataset(
     url = get_dataset_url()
 
     if csv_path.exists() and not force:
-        sha = _sha256_file(csv_path)
+        sha = _cached_sha256(csv_path)
         meta = SourceMetadata(
             dataset_id=DATASET_ID,
             url=url,
-            accessed_at_utc=dt.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            accessed_at_utc=_now_iso_utc(),
             local_path=str(csv_path),
             sha256=sha,
         )
         return csv_path, meta
 
-    resp = requests.get(url, timeout=timeout_sec)
-    resp.raise_for_status()
-
-    csv_path.write_bytes(resp.content)
-
-    sha = _sha256_file(csv_path)
+    # Stream straight to disk instead of buffering the whole CSV in memory, hashing
+    # each chunk on the way so the file never has to be re-read for its SHA-256.
+    # Write to a .part file first so an interrupted download never looks like a cache hit.
+    part_path = csv_path.with_suffix(csv_path.suffix + ".part")
+    h = hashlib.sha256()
+    try:
+        with requests.get(url, timeout=timeout_sec, stream=True) as resp:
+            resp.raise_for_status()
+            with part_path.open("wb") as f:
+                for chunk in resp.iter_content(chunk_size=1024 * 1024):
+                    h.update(chunk)
+                    f.write(chunk)
+        part_path.replace(csv_path)
+    finally:
+        part_path.unlink(missing_ok=True)
+
+    sha = h.hexdigest()
+    _sha256_sidecar(csv_path).write_text(sha)
     meta = SourceMetadata(
         dataset_id=DATASET_ID,
         url=url,
-        accessed_at_utc=dt.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        accessed_at_utc=_now_iso_utc(),
         local_path=str(csv_path),
         sha256=sha,
     )
     return csv_path, meta
 
 
-def connect_duckdb(db_path: Path = DEFAULT_DUCKDB_PATH) -> duckdb.DuckDBPyConnection:
+def connect_duckdb(
+    db_path: Path = DEFAULT_DUCKDB_PATH,
+    read_only: bool = False,
+) -> duckdb.DuckDBPyConnection:
     """
     Connect to a persistent DuckDB database file under data/owid by default.
+
+    - read_only=False: needed to create/replace energy_raw (ensure_loaded does this)
+    - read_only=True: for query-serving paths once the data is loaded; several
+      processes can hold read-only connections to the same file at once
     """
+    if read_only:
+        return duckdb.connect(str(db_path), read_only=True)
     db_path.parent.mkdir(parents=True, exist_ok=True)
     return duckdb.connect(str(db_path))
 
@@ -113,33 +178,116 @@ def load_energy_raw(
     replace: bool = False,
 ) -> None:
     """
-    Load CSV into DuckDB as a table.
+    Expose the CSV in DuckDB as `table_name`: a view over a ZSTD Parquet copy of the
+    CSV (written next to it), so queries only read the columns they reference and
+    the .duckdb file doesn't hold a second copy of the data.
 
-    - replace=False: will only create if table doesn't exist
-    - replace=True: will drop+recreate
+    - replace=False: will only create if table/view doesn't exist (a view whose
+      Parquet file is missing or older than the CSV is rebuilt)
+    - replace=True: will drop+recreate (and rewrite the Parquet file)
 
-    Uses read_csv_auto for convenience (Phase 1).
+    Column types for the key and curated metric columns are pinned; the rest are
+    inferred by DuckDB from its default sample.
     """
-    if replace:
-        conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+    # Look the name up in DuckDB's catalog functions directly rather than
+    # scanning the information_schema.tables view.
+    existing = conn.execute(
+        """
+        SELECT 'VIEW', sql FROM duckdb_views() WHERE view_name = ? AND NOT internal
+        UNION ALL
+        SELECT 'TABLE', NULL FROM duckdb_tables() WHERE table_name = ?
+        LIMIT 1
+        """,
+        [table_name, table_name],
+    ).fetchone()
 
-    # If table exists and replace=False, do nothing
-    exists = conn.execute(
-        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
-        [table_name],
-    ).fetchone()[0]
-    if exists and not replace:
-        return
+    parquet_path = csv_path.with_suffix(".parquet")
+    # A deleted CSV doesn't make an existing Parquet copy stale: it is all we have left.
+    parquet_fresh = parquet_path.exists() and (
+        not csv_path.exists()
+        or parquet_path.stat().st_mtime >= csv_path.stat().st_mtime
+    )
+    # DDL can't take prepared parameters, so the path is inlined as a string literal.
+    # Absolute, so the persisted view resolves regardless of the working directory.
+    parquet_sql = _sql_path_literal(parquet_path.resolve())
+
+    # If table/view exists and replace=False, do nothing -- unless it's a view whose
+    # Parquet file is missing, stale, or at another path (cache cleared/project moved).
+    if existing and not replace:
+        kind, view_sql = existing
+        if kind == "TABLE" or (parquet_fresh and parquet_sql in view_sql):
+            return
+
+    if existing:
+        # energy_raw may still be a materialized table from before the Parquet layout.
+        conn.execute(f"DROP {existing[0]} {table_name}")
+        invalidate_schema_cache(conn, table_name)
+
+    if replace or not parquet_fresh:
+        _csv_to_parquet(conn, csv_path, parquet_path)
 
-    # Create from CSV
-    # We set sample_size=-1 to scan whole file for type inference (slower but safer for Phase 1).
     conn.execute(
-        f"""
-        CREATE TABLE {table_name} AS
-        SELECT * FROM read_csv_auto(?, sample_size=-1)
-        """,
-        [str(csv_path)],
+        f"CREATE VIEW {table_name} AS SELECT * FROM read_parquet({parquet_sql})"
+    )
+    invalidate_schema_cache(conn, table_name)
+
+
+def _csv_to_parquet(
+    conn: duckdb.DuckDBPyConnection,
+    csv_path: Path,
+    parquet_path: Path,
+) -> None:
+    """
+    Convert the CSV to Parquet in a single pass (no sample_size=-1 inference scan
+    over the whole file). Written to a .part file and renamed into place.
+    """
+    part_path = parquet_path.with_suffix(parquet_path.suffix + ".part")
+
+    params: list = [str(csv_path)]
+    options = "header=true"
+    types = _csv_column_types(csv_path)
+    if types:
+        options += ", types=?"
+        params.append(types)
+
+    copy_sql = (
+        "COPY (SELECT * FROM read_csv(?, {options})) "
+        "TO {target} (FORMAT PARQUET, COMPRESSION ZSTD)"
     )
+    target = _sql_path_literal(part_path)
+    try:
+        try:
+            conn.execute(copy_sql.format(options=options, target=target), params)
+        except (duckdb.ConversionException, duckdb.InvalidInputException):
+            # An unpinned column's sampled type didn't hold for the whole file:
+            # fall back to inferring types from every row.
+            conn.execute(
+                copy_sql.format(options=options + ", sample_size=-1", target=target),
+                params,
+            )
+        part_path.replace(parquet_path)
+    finally:
+        part_path.unlink(missing_ok=True)
+
+
+def _sql_path_literal(path: Path) -> str:
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+def _csv_column_types(csv_path: Path) -> Dict[str, str]:
+    """
+    Return {column_name: duckdb_type} for the columns we query, limited to those
+    present in the CSV header (read_csv rejects types for unknown columns).
+    """
+    with csv_path.open(newline="", encoding="utf-8") as f:
+        header = set(next(csv.reader(f), []))
+
+    types = dict(COLUMN_TYPES)
+    registry = metrics.DEFAULT_METRIC_REGISTRY
+    for metric_id in registry.metric_ids(DATASET_ID):
+        column = registry.get(DATASET_ID, metric_id).column
+        types.setdefault(column, "DOUBLE")
+    return {c: t for c, t in types.items() if c in header}
 
 
 def inspect_schema(
@@ -148,12 +296,33 @@ def inspect_schema(
 ) -> Dict[str, str]:
     """
     Return {column_name: duckdb_type}.
+
+    Cached per (connection, table); load_energy_raw invalidates the entry when it
+    (re)creates the table.
+    """
+    tables = _SCHEMA_CACHE.get(conn)
+    schema = tables.get(table_name) if tables is not None else None
+    if schema is None:
+        rows = conn.execute(
+            f"PRAGMA table_info('{table_name}')"
+        ).fetchall()
+        # pragma returns: (cid, name, type, notnull, dflt_value, pk)
+        schema = {r[1]: r[2] for r in rows}
+        if schema:
+            _SCHEMA_CACHE.setdefault(conn, {})[table_name] = schema
+    return dict(schema)
+
+
+def invalidate_schema_cache(
+    conn: duckdb.DuckDBPyConnection,
+    table_name: str = TABLE_NAME,
+) -> None:
+    """
+    Drop the cached inspect_schema() result for (conn, table_name).
     """
-    rows = conn.execute(
-        f"PRAGMA table_info('{table_name}')"
-    ).fetchall()
-    # pragma returns: (cid, name, type, notnull, dflt_value, pk)
-    return {r[1]: r[2] for r in rows}
+    tables = _SCHEMA_CACHE.get(conn)
+    if tables is not None:
+        tables.pop(table_name, None)
 
 
 def validate_required_columns(